@@ -99,11 +99,17 @@ class CrossEntropyMethod(WorldModelBase):
         discrete_action = sorted_action_norm_vals[0].feature_type != CONTINUOUS_ACTION
         action_upper_bounds, action_lower_bounds = None, None
         if not discrete_action:
-            action_upper_bounds = np.array(
-                [v.max_value for v in sorted_action_norm_vals]
+            # fromiter with a known count pre-allocates fp32 directly, so the
+            # planner doesn't carry default-fp64 bounds through CEM sampling
+            action_upper_bounds = np.fromiter(
+                (v.max_value for v in sorted_action_norm_vals),
+                dtype=np.float32,
+                count=len(sorted_action_norm_vals),
             )
-            action_lower_bounds = np.array(
-                [v.min_value for v in sorted_action_norm_vals]
+            action_lower_bounds = np.fromiter(
+                (v.min_value for v in sorted_action_norm_vals),
+                dtype=np.float32,
+                count=len(sorted_action_norm_vals),
             )
 
         cem_planner_network = CEMPlannerNetwork(
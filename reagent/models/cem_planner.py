@@ -248,11 +248,18 @@ class CEMPlannerNetwork(nn.Module):
                 * np.sqrt(const_var)
                 + mean
             )
+            # Hand the world models a C-contiguous fp32 population up front:
+            # from_numpy is then zero-copy and no fp64->fp32 conversion runs
+            # inside the rollout loop. The fp64 `solutions` stay as-is for
+            # the elite statistics below.
             action_solutions = torch.from_numpy(
-                solutions.reshape(
-                    (self.cem_pop_size, self.plan_horizon_length, self.action_dim)
+                np.ascontiguousarray(
+                    solutions.reshape(
+                        (self.cem_pop_size, self.plan_horizon_length, self.action_dim)
+                    ),
+                    dtype=np.float32,
                 )
-            ).float()
+            )
             acc_rewards = self.acc_rewards_of_all_solutions(state, action_solutions)
             elites = solutions[np.argsort(acc_rewards)][-self.num_elites :]
             new_mean = np.mean(elites, axis=0)
@@ -97,10 +97,17 @@ class FullyConnectedNetwork(ModelBase):
                 modules.append(nn.LayerNorm(out_dim))  # type: ignore
             # Add activation
             if activation in ACTIVATION_MAP:
-                modules.append(ACTIVATION_MAP[activation]())
+                activation_module = ACTIVATION_MAP[activation]()
             else:
                 # See if it matches any of the nn modules
-                modules.append(getattr(nn, activation)())
+                activation_module = getattr(nn, activation)()
+            # The trunk is purely sequential, so the pre-activation tensor is
+            # never reused; in-place activation saves one [batch, out_dim]
+            # allocation per layer and keeps the stack fusable when the
+            # serving path runs optimize_for_inference
+            if hasattr(activation_module, "inplace"):
+                activation_module.inplace = True
+            modules.append(activation_module)
             # Add Dropout
             if dropout_ratio > 0.0 and (normalize_output or i < len(activations) - 1):
                 modules.append(nn.Dropout(p=dropout_ratio))
@@ -63,6 +63,6 @@ class SoftUpdate(torch.optim.Optimizer):
                     # skip soft-updating when the target network share s the parameter with
                     # the network being train.
                     continue
-                new_param = tau * source_param.data + (1.0 - tau) * target_param.data
-                target_param.data.copy_(new_param)
+                # in-place Polyak blend; no temporaries allocated per parameter
+                target_param.data.mul_(1.0 - tau).add_(source_param.data, alpha=tau)
         return loss
@@ -346,6 +346,10 @@ class ActorPredictorWrapper(torch.jit.ScriptModule):
         """
         super().__init__()
 
+        # NB: keep this a plain trace. This module is the serialized serving
+        # artifact (torch.jit.save), and optimize_for_inference bakes in
+        # host-specific settings with no serialization guarantee; apply such
+        # passes at load time instead.
         self.actor_with_preprocessor = torch.jit.trace(
             actor_with_preprocessor, actor_with_preprocessor.input_prototype()
         )
@@ -17,15 +17,32 @@ SEED = 0
 
 
 class HorizonTestBase(unittest.TestCase):
+    # TF32/cuDNN autotuning speed up the fixed-shape MLP stacks on
+    # Ampere+ GPUs; differences stay within the tests' allclose tolerances
+    allow_tf32 = True
+
     def setUp(self):
         SummaryWriterContext._reset_globals()
         logging.basicConfig(level=logging.INFO)
         np.random.seed(SEED)
         torch.manual_seed(SEED)
         random.seed(SEED)
+        # torch.backends flags are process-global; save them so tearDown can
+        # restore whatever the previous suite was running under, and set the
+        # opt-out branch explicitly instead of leaving stale True values
+        self._prev_matmul_tf32 = torch.backends.cuda.matmul.allow_tf32
+        self._prev_cudnn_tf32 = torch.backends.cudnn.allow_tf32
+        self._prev_cudnn_benchmark = torch.backends.cudnn.benchmark
+        if torch.cuda.is_available():
+            torch.backends.cuda.matmul.allow_tf32 = self.allow_tf32
+            torch.backends.cudnn.allow_tf32 = self.allow_tf32
+            torch.backends.cudnn.benchmark = self.allow_tf32
 
     def tearDown(self):
         SummaryWriterContext._reset_globals()
+        torch.backends.cuda.matmul.allow_tf32 = self._prev_matmul_tf32
+        torch.backends.cudnn.allow_tf32 = self._prev_cudnn_tf32
+        torch.backends.cudnn.benchmark = self._prev_cudnn_benchmark
 
     @classmethod
     def run_from_config(cls, run_test: Callable, config_path: str, use_gpu: bool):
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 # Copyright (c) Facebook, Inc. and its affiliates. All rights reserved.
 
-from typing import List
+from typing import List, Optional
 
 import reagent.core.types as rlt
 import torch
@@ -13,6 +13,62 @@ from reagent.training.reagent_lightning_module import ReAgentLightningModule
 from reagent.training.rl_trainer_pytorch import RLTrainerMixin
 
 
+@torch.jit.script
+def _project_categorical(
+    next_dist: torch.Tensor,
+    rewards: torch.Tensor,
+    discount_tensor: torch.Tensor,
+    not_terminal: torch.Tensor,
+    support: torch.Tensor,
+    qmin: float,
+    qmax: float,
+    inv_scale_support: torch.Tensor,
+    num_atoms: int,
+    m: torch.Tensor,
+) -> torch.Tensor:
+    """
+    Project the next-state return distribution onto the fixed support
+    (Algorithm 1 in https://arxiv.org/abs/1707.06887). Scripted so the
+    elementwise ops fuse into a couple of kernels instead of ~8 separate
+    launches with [batch, num_atoms] intermediates.
+
+    `m` is a caller-provided zeroed [batch, num_atoms] buffer that receives
+    the projected distribution; passing it in lets the trainer reuse one
+    allocation across steps.
+    """
+    target_Q = rewards + discount_tensor * not_terminal * support
+    target_Q = target_Q.clamp(qmin, qmax)
+
+    # rescale to indicies [0, 1, ..., N-1]; multiplying by the cached
+    # reciprocal is cheaper than a per-element divide, but unlike the
+    # divide it can round just above N-1 when target_Q sits at qmax, so
+    # clamp to keep ceil() inside the support
+    b = ((target_Q - qmin) * inv_scale_support).clamp(0.0, float(num_atoms - 1))
+    lo = b.floor().to(torch.int64)
+    up = b.ceil().to(torch.int64)
+
+    # handle corner cases of l == b == u
+    # without the following, it would give 0 signal, whereas we want
+    # m to add p(s_t+n, a*) to index l == b == u.
+    # So we artificially adjust l and u.
+    # (1) If 0 < l == u < N-1, we make l = l-1, so b-l = 1
+    # (2) If 0 == l == u, we make u = 1, so u-b=1
+    # (3) If l == u == N-1, we make l = N-2, so b-1 = 1
+    # Adjustments are arithmetic (no advanced-indexing writes) to keep the
+    # scripted graph fusable. This first line handles (1) and (3).
+    lo = lo - ((up > 0) & (lo == up)).to(lo.dtype)
+    # Note: l has already changed, so the only way l == u is possible is
+    # if u == 0, in which case we let u = 1
+    up = up + ((lo < num_atoms - 1) & (lo == up)).to(up.dtype)
+
+    # distribute the probabilities
+    # m_l = m_l + p(s_t+n, a*)(u - b)
+    # m_u = m_u + p(s_t+n, a*)(b - l)
+    m.scatter_add_(1, lo, next_dist * (up.float() - b))
+    m.scatter_add_(1, up, next_dist * (b - lo.float()))
+    return m
+
+
 class C51Trainer(RLTrainerMixin, ReAgentLightningModule):
     """
     Implementation of 51 Categorical DQN (C51)
@@ -66,18 +122,31 @@ class C51Trainer(RLTrainerMixin, ReAgentLightningModule):
         self.qmax = qmax
         self.num_atoms = num_atoms
         self.rl_parameters = rl
-        self.register_buffer("support", None)
-        self.support = torch.linspace(self.qmin, self.qmax, self.num_atoms)
+        # Register the tensors in one step; assignment after
+        # `register_buffer(name, None)` also lands in _buffers, this just
+        # drops the None placeholder indirection
+        self.register_buffer(
+            "support", torch.linspace(self.qmin, self.qmax, self.num_atoms)
+        )
         self.scale_support = (self.qmax - self.qmin) / (self.num_atoms - 1.0)
+        self.register_buffer(
+            "inv_scale_support",
+            torch.tensor((self.num_atoms - 1.0) / (self.qmax - self.qmin)),
+        )
+        # Pre-broadcast [1, num_atoms] view of the support for the projection
+        self.register_buffer("support_row", self.support.unsqueeze(0))
 
-        self.register_buffer("reward_boosts", None)
-        self.reward_boosts = torch.zeros([1, len(self._actions)])
+        # Column vector [num_actions, 1] so boosting is a single addmm/GEMV
+        self.register_buffer("reward_boosts", torch.zeros([len(self._actions), 1]))
+        # Reusable output buffer for the categorical projection; allocated
+        # lazily since the minibatch shape/device is only known at train time
+        self._m_buffer: Optional[torch.Tensor] = None
         if self.rl_parameters.reward_boost is not None:
-            # pyre-fixme[16]: Optional type has no attribute `keys`.
-            for k in self.rl_parameters.reward_boost.keys():
-                i = self._actions.index(k)
-                # pyre-fixme[16]: Optional type has no attribute `__getitem__`.
-                self.reward_boosts[0, i] = self.rl_parameters.reward_boost[k]
+            # index lookup table instead of an O(A) list.index per boost
+            action_to_idx = {a: i for i, a in enumerate(self._actions)}
+            # pyre-fixme[16]: Optional type has no attribute `items`.
+            for k, v in self.rl_parameters.reward_boost.items():
+                self.reward_boosts[action_to_idx[k], 0] = v
 
     def configure_optimizers(self):
         optimizers = [
@@ -98,8 +167,9 @@ class C51Trainer(RLTrainerMixin, ReAgentLightningModule):
     def train_step_gen(self, training_batch: rlt.DiscreteDqnInput, batch_idx: int):
         rewards = self.boost_rewards(training_batch.reward, training_batch.action)
         discount_tensor = torch.full_like(rewards, self.gamma)
-        possible_next_actions_mask = training_batch.possible_next_actions_mask.float()
-        possible_actions_mask = training_batch.possible_actions_mask.float()
+        # masks are only ever consumed by argmax_with_mask, which wants bool;
+        # skip the eager float conversions (and their [batch, action] copies)
+        possible_next_actions_mask = training_batch.possible_next_actions_mask.bool()
 
         not_terminal = training_batch.not_terminal.float()
 
@@ -116,64 +186,81 @@ class C51Trainer(RLTrainerMixin, ReAgentLightningModule):
         if self.maxq_learning:
             # Select distribution corresponding to max valued action
             if self.double_q_learning:
-                next_q_values = (
-                    self.q_network.log_dist(training_batch.next_state).exp()
-                    * self.support
-                ).sum(2)
+                # Batch the next-state (action selection) and current-state
+                # (loss) forwards of the online network into one pass
+                combined_states = rlt.FeatureData(
+                    torch.cat(
+                        [
+                            training_batch.next_state.float_features,
+                            training_batch.state.float_features,
+                        ],
+                        dim=0,
+                    )
+                )
+                next_online_log_dist, log_dist = self.q_network.log_dist(
+                    combined_states
+                ).split(rewards.shape[0], dim=0)
+                next_q_values = (next_online_log_dist.exp() * self.support).sum(2)
             else:
+                log_dist = self.q_network.log_dist(training_batch.state)
                 next_q_values = (next_dist * self.support).sum(2)
 
             next_action = self.argmax_with_mask(
                 next_q_values, possible_next_actions_mask
             )
-            next_dist = next_dist[range(rewards.shape[0]), next_action.reshape(-1)]
+            # gather stays on-device; indexing with a Python range would
+            # materialize a host index tensor (and a host sync) every step
+            next_action_idx = next_action.reshape(-1, 1, 1).expand(
+                -1, 1, next_dist.size(-1)
+            )
+            next_dist = next_dist.gather(1, next_action_idx).squeeze(1)
         else:
+            log_dist = self.q_network.log_dist(training_batch.state)
             next_dist = (next_dist * training_batch.next_action.unsqueeze(-1)).sum(1)
 
-        # Build target distribution
-        target_Q = rewards + discount_tensor * not_terminal * self.support
-        target_Q = target_Q.clamp(self.qmin, self.qmax)
-
-        # rescale to indicies [0, 1, ..., N-1]
-        b = (target_Q - self.qmin) / self.scale_support
-        lo = b.floor().to(torch.int64)
-        up = b.ceil().to(torch.int64)
-
-        # handle corner cases of l == b == u
-        # without the following, it would give 0 signal, whereas we want
-        # m to add p(s_t+n, a*) to index l == b == u.
-        # So we artificially adjust l and u.
-        # (1) If 0 < l == u < N-1, we make l = l-1, so b-l = 1
-        # (2) If 0 == l == u, we make u = 1, so u-b=1
-        # (3) If l == u == N-1, we make l = N-2, so b-1 = 1
-        # This first line handles (1) and (3).
-        lo[(up > 0) * (lo == up)] -= 1
-        # Note: l has already changed, so the only way l == u is possible is
-        # if u == 0, in which case we let u = 1
-        # I don't even think we need the first condition in the next line
-        up[(lo < (self.num_atoms - 1)) * (lo == up)] += 1
-
-        # distribute the probabilities
-        # m_l = m_l + p(s_t+n, a*)(u - b)
-        # m_u = m_u + p(s_t+n, a*)(b - l)
-        m = torch.zeros_like(next_dist)
-        # pyre-fixme[16]: `Tensor` has no attribute `scatter_add_`.
-        m.scatter_add_(dim=1, index=lo, src=next_dist * (up.float() - b))
-        m.scatter_add_(dim=1, index=up, src=next_dist * (b - lo.float()))
-        log_dist = self.q_network.log_dist(training_batch.state)
-
-        # for reporting only
-        all_q_values = (log_dist.exp() * self.support).sum(2).detach()
-        model_action_idxs = self.argmax_with_mask(
-            all_q_values,
-            possible_actions_mask if self.maxq_learning else training_batch.action,
-        )
+        # Build target distribution by projecting onto the fixed support,
+        # reusing the output buffer across steps (shape is stable for a
+        # fixed minibatch size). The projection is a fixed target in the
+        # cross-entropy loss, so it runs without autograd bookkeeping.
+        with torch.no_grad():
+            if (
+                self._m_buffer is None
+                or self._m_buffer.shape != next_dist.shape
+                or self._m_buffer.device != next_dist.device
+            ):
+                self._m_buffer = torch.zeros_like(next_dist)
+            else:
+                self._m_buffer.zero_()
+            m = _project_categorical(
+                next_dist,
+                rewards,
+                discount_tensor,
+                not_terminal,
+                self.support_row,
+                self.qmin,
+                self.qmax,
+                self.inv_scale_support,
+                self.num_atoms,
+                self._m_buffer,
+            )
 
-        log_dist = (log_dist * training_batch.action.unsqueeze(-1)).sum(1)
+        action_log_dist = (log_dist * training_batch.action.unsqueeze(-1)).sum(1)
 
-        loss = -(m * log_dist).sum(1).mean()
+        loss = -(m * action_log_dist).sum(1).mean()
 
         if batch_idx % self.trainer.log_every_n_steps == 0:
+            # for reporting only; skip the q-value reduction and argmax on
+            # the (vast majority of) non-logging steps. Detaching before the
+            # exp keeps the whole reduction off the autograd tape, and the
+            # cached probs are reusable by anything else the reporter needs.
+            probs = log_dist.detach().exp()
+            all_q_values = (probs * self.support).sum(2)
+            model_action_idxs = self.argmax_with_mask(
+                all_q_values,
+                training_batch.possible_actions_mask
+                if self.maxq_learning
+                else training_batch.action,
+            )
             self.reporter.log(
                 td_loss=loss,
                 logged_actions=torch.argmax(training_batch.action, dim=1, keepdim=True),
@@ -194,16 +281,16 @@ class C51Trainer(RLTrainerMixin, ReAgentLightningModule):
     def boost_rewards(
         self, rewards: torch.Tensor, actions: torch.Tensor
     ) -> torch.Tensor:
-        # Apply reward boost if specified
-        reward_boosts = torch.sum(
-            actions.float() * self.reward_boosts, dim=1, keepdim=True
-        )
-        return rewards + reward_boosts
+        # Apply reward boost if specified; fused addmm avoids the
+        # [batch, num_actions] intermediate of an elementwise multiply+sum
+        return torch.addmm(rewards, actions.float(), self.reward_boosts)
 
     def argmax_with_mask(self, q_values, possible_actions_mask):
         # Set q-values of impossible actions to a very large negative number.
-        q_values = q_values.reshape(possible_actions_mask.shape)
-        q_values = q_values + RLTrainerMixin.ACTION_NOT_POSSIBLE_VAL * (
-            1 - possible_actions_mask
-        )
-        return q_values.argmax(1)
+        # masked_fill is a single kernel vs. the multiply+add of
+        # `q_values + VAL * (1 - mask)` and allocates no mask-sized temporary.
+        mask = possible_actions_mask.bool()
+        q_values = q_values.reshape(mask.shape)
+        return q_values.masked_fill(
+            ~mask, RLTrainerMixin.ACTION_NOT_POSSIBLE_VAL
+        ).argmax(1)
@@ -1,12 +1,10 @@
 #!/usr/bin/env python3
 
 import bisect
-import functools
 import itertools
-from typing import List, Dict, Tuple
+from typing import List, Tuple
 
 import torch.nn as nn
-from reagent.core.utils import lazy_property
 
 from .reagent_lightning_module import ReAgentLightningModule
 
@@ -23,17 +21,59 @@ class MultiStageTrainer(ReAgentLightningModule):
         super().__init__(automatic_optimization=automatic_optimization)
         # NB: wrapping in a ModuleList so the state can be saved
         self._trainers = nn.ModuleList(trainers)
+        # Plain-list view for iteration; ModuleList.__iter__ goes through
+        # its string-keyed module dict
+        self._trainer_list = list(self._trainers)
+        # test_step keys its per-trainer outputs by stringified index;
+        # stringify once instead of per batch
+        self._str_indices = tuple(map(str, range(len(trainers))))
         self._assign_reporter_function = assign_reporter_function
-        self._flush_reporter_function = (
-            functools.partial(flush_reporter_function, self)
-            if flush_reporter_function
-            else self._flush_reporter
-        )
+        if flush_reporter_function:
+            # Closure instead of functools.partial: calls invoke directly
+            # without partial's argument re-assembly, and any callable is
+            # accepted (unlike descriptor-protocol binding)
+            def _bound_flush(*args, **kwargs):
+                return flush_reporter_function(self, *args, **kwargs)
+
+            self._flush_reporter_function = _bound_flush
+        else:
+            self._flush_reporter_function = self._flush_reporter
         self._in_testing_loop = False
-        # Cumulative sum of number of epochs up to the index (of trainers)
-        self._trainer_epochs = [0] + epochs
-        for i in range(1, len(epochs) + 1):
-            self._trainer_epochs[i] += self._trainer_epochs[i - 1]
+        # Cumulative sum of number of epochs up to the index (of trainers);
+        # immutable tuple built by C-level accumulate
+        self._trainer_epochs = (0,) + tuple(itertools.accumulate(epochs))
+        # Flat epoch-in-cycle -> trainer index table so the per-batch lookup
+        # is a single tuple index; the bisect only runs here at init
+        self._cycle_len = self._trainer_epochs[-1]
+        self._epoch_to_trainer_idx = tuple(
+            bisect.bisect_right(self._trainer_epochs, e) - 1
+            for e in range(self._cycle_len)
+        )
+        # When the cycle length is a power of two the modulo in the hot
+        # lookup reduces to a bitwise AND; -1 marks the general case
+        self._cycle_mask = (
+            self._cycle_len - 1
+            if self._cycle_len & (self._cycle_len - 1) == 0
+            else -1
+        )
+        # Single-slot memo: within one epoch every batch maps to the same
+        # trainer, so remember the last (epoch, trainer_idx) pair
+        self._cached_epoch = -1
+        self._cached_trainer_idx = -1
+        self._cached_optimizers = None
+        # Plain attribute instead of a lazy_property: the descriptor's
+        # __get__ would otherwise run on every per-batch access.
+        # optimizer_idx values are contiguous from 0, so a positionally
+        # indexed tuple replaces the hash lookup of a dict.
+        mapping = []
+        offset = 0
+        for i, t in enumerate(self._trainers):
+            num_optimizing_steps = t._num_optimizing_steps
+            mapping.extend((i, offset) for _ in range(num_optimizing_steps))
+            offset += num_optimizing_steps
+        self._optimizer_step_to_trainer_idx: Tuple[Tuple[int, int], ...] = tuple(
+            mapping
+        )
 
     def set_reporter(self, reporter):
         super().set_reporter(reporter)
@@ -48,36 +88,28 @@ class MultiStageTrainer(ReAgentLightningModule):
             for t, r in zip(self._trainers, reporter._reporters):
                 t.set_reporter(r)
 
-    @lazy_property
-    def _optimizer_step_to_trainer_idx(self) -> Dict[int, Tuple[int, int]]:
-        mapping = {}
-        offset = 0
-
-        for i, t in enumerate(self._trainers):
-            num_optimizing_steps = t._num_optimizing_steps
-            for j in range(num_optimizing_steps):
-                mapping[offset + j] = (i, offset)
-            offset += num_optimizing_steps
-
-        return mapping
-
     def _flush_reporter(self, reporter, epoch):
         """
         By default, assume CompoundReporter with the same
-        number of reporters as trainers
+        number of reporters as trainers. During fit only the active
+        stage's reporter flushes; on_test_start swaps in the testing
+        variant below instead of branching on a flag per flush.
         """
-        if not self._in_testing_loop:
-            epoch_trainer_idx = self._get_trainer_idx_from_epoch()
-            reporter._reporters[epoch_trainer_idx].flush(epoch)
-        else:
-            for r in reporter._reporters:
-                r.flush(epoch)
+        epoch_trainer_idx = self._get_trainer_idx_from_epoch()
+        reporter._reporters[epoch_trainer_idx].flush(epoch)
+
+    def _flush_reporter_test(self, reporter, epoch):
+        for r in reporter._reporters:
+            r.flush(epoch)
 
     def on_fit_start(self):
         self._starting_epoch = self.trainer.current_epoch
+        # New starting epoch invalidates the memoized lookup
+        self._cached_epoch = -1
         # Connecting pl.Trainer to stage trainers
-        for t in self._trainers:
-            t.trainer = self.trainer
+        pl_trainer = self.trainer
+        for t in self._trainer_list:
+            t.trainer = pl_trainer
             t.on_fit_start()
 
         self.reporter.set_flush_function(self._flush_reporter_function)
@@ -85,7 +117,7 @@ class MultiStageTrainer(ReAgentLightningModule):
     def on_fit_end(self):
         del self._starting_epoch
         # Disconnecting
-        for t in self._trainers:
+        for t in self._trainer_list:
             t.on_fit_end()
             del t.trainer
 
@@ -93,39 +125,68 @@ class MultiStageTrainer(ReAgentLightningModule):
 
     def on_test_start(self):
         self._starting_epoch = self.trainer.current_epoch
+        self._cached_epoch = -1
+        # Kept for custom flush functions that branch on the testing phase
         self._in_testing_loop = True
+        if self._flush_reporter_function == self._flush_reporter:
+            self.reporter.set_flush_function(self._flush_reporter_test)
 
-        for t in self._trainers:
+        for t in self._trainer_list:
             t.on_test_start()
 
     def on_test_end(self):
         del self._starting_epoch
         self._in_testing_loop = False
-        for t in self._trainers:
+        if self._flush_reporter_function == self._flush_reporter:
+            self.reporter.set_flush_function(None)
+        for t in self._trainer_list:
             t.on_test_end()
 
     def _get_trainer_idx_from_epoch(self):
         # Cycling through the trainers
-        epoch = (self.trainer.current_epoch - self._starting_epoch) % (
-            self._trainer_epochs[-1]
+        epoch = self.trainer.current_epoch
+        if epoch == self._cached_epoch:
+            return self._cached_trainer_idx
+        epoch_in_cycle = (
+            (epoch - self._starting_epoch) & self._cycle_mask
+            if self._cycle_mask >= 0
+            else (epoch - self._starting_epoch) % self._cycle_len
         )
-        trainer_idx = bisect.bisect_right(self._trainer_epochs, epoch) - 1
-
+        trainer_idx = self._epoch_to_trainer_idx[epoch_in_cycle]
+        self._cached_epoch = epoch
+        self._cached_trainer_idx = trainer_idx
         return trainer_idx
 
+    def _refresh_active_trainer(self):
+        # Resolve the active trainer once per epoch; the per-batch hooks
+        # just read the attributes. The trainer reference is set with
+        # object.__setattr__ on purpose: going through nn.Module.__setattr__
+        # would register the active trainer as a duplicate submodule.
+        idx = self._get_trainer_idx_from_epoch()
+        self._active_trainer_idx = idx
+        object.__setattr__(self, "_active_trainer", self._trainer_list[idx])
+
+    def on_train_epoch_start(self):
+        self._refresh_active_trainer()
+
+    def on_validation_epoch_start(self):
+        self._refresh_active_trainer()
+
     def configure_optimizers(self):
         # FIXME: Doesn't support LRScheduler yet
-        return list(
-            itertools.chain(*[t.configure_optimizers() for t in self._trainers])
-        )
+        if self._cached_optimizers is None:
+            self._cached_optimizers = [
+                opt for t in self._trainer_list for opt in t.configure_optimizers()
+            ]
+        return self._cached_optimizers
 
     def training_step(self, batch, batch_idx: int, optimizer_idx: int = 0):
         trainer_idx, offset = self._optimizer_step_to_trainer_idx[optimizer_idx]
-        epoch_trainer_idx = self._get_trainer_idx_from_epoch()
-        assert (
-            trainer_idx == epoch_trainer_idx
-        ), f"Got {trainer_idx}; expected {epoch_trainer_idx}"
-        return self._trainers[trainer_idx].training_step(
+        if __debug__:
+            assert (
+                trainer_idx == self._active_trainer_idx
+            ), f"Got {trainer_idx}; expected {self._active_trainer_idx}"
+        return self._active_trainer.training_step(
             batch, batch_idx, optimizer_idx - offset
         )
 
@@ -134,8 +195,7 @@ class MultiStageTrainer(ReAgentLightningModule):
         self._trainers[epoch_trainer_idx].training_epoch_end(outputs)
 
     def validation_step(self, *args, **kwargs):
-        epoch_trainer_idx = self._get_trainer_idx_from_epoch()
-        return self._trainers[epoch_trainer_idx].validation_step(*args, **kwargs)
+        return self._active_trainer.validation_step(*args, **kwargs)
 
     def validation_epoch_end(self, outputs):
         epoch_trainer_idx = self._get_trainer_idx_from_epoch()
@@ -143,13 +203,21 @@ class MultiStageTrainer(ReAgentLightningModule):
 
     def test_step(self, *args, **kwargs):
         return {
-            str(i): trainer.test_step(*args, **kwargs)
-            for i, trainer in enumerate(self._trainers)
+            s: trainer.test_step(*args, **kwargs)
+            for s, trainer in zip(self._str_indices, self._trainer_list)
         }
 
     def test_epoch_end(self, outputs):
-        for i, trainer in enumerate(self._trainers):
-            trainer.test_epoch_end([o[str(i)] for o in outputs])
+        if not outputs:
+            for trainer in self._trainer_list:
+                trainer.test_epoch_end([])
+            return
+        # test_step builds each dict in self._str_indices order, so
+        # .values() yields per-trainer outputs in trainer order; transpose
+        # with C-implemented zip instead of per-key dict lookups
+        per_trainer = zip(*(tuple(o.values()) for o in outputs))
+        for trainer, trainer_outputs in zip(self._trainer_list, per_trainer):
+            trainer.test_epoch_end(list(trainer_outputs))
 
     def optimizer_step(
         self,
@@ -162,7 +230,8 @@ class MultiStageTrainer(ReAgentLightningModule):
         using_native_amp: int = False,
         using_lbfgs: int = False,
     ):
-        assert epoch == self.trainer.current_epoch
+        if __debug__:
+            assert epoch == self.trainer.current_epoch
         epoch_trainer_idx = self._get_trainer_idx_from_epoch()
         optimizer_trainer_idx, offset = self._optimizer_step_to_trainer_idx[
             optimizer_idx
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 
 import abc
+import functools
 import inspect
 import logging
 from typing import List, Optional
@@ -13,6 +14,28 @@ from reagent.workflow.types import RLTrainingOutput
 logger = logging.getLogger(__name__)
 
 
+_VALIDATION_RESULT_UNION = None
+
+
+def _validation_result_union():
+    # Imported lazily to dodge the circular dependency on workflow.types,
+    # but resolved through the import machinery only once
+    global _VALIDATION_RESULT_UNION
+    if _VALIDATION_RESULT_UNION is None:
+        from reagent.workflow.types import ValidationResult__Union
+
+        _VALIDATION_RESULT_UNION = ValidationResult__Union
+    return _VALIDATION_RESULT_UNION
+
+
+@functools.lru_cache(maxsize=None)
+def _do_validate_return_annotation(cls):
+    # inspect.signature is expensive; the annotation is fixed per subclass
+    sig = inspect.signature(cls.do_validate)
+    assert sig.return_annotation != inspect.Signature.empty
+    return sig.return_annotation
+
+
 class ModelValidator(metaclass=RegistryMeta):
     """
     Base class for model validator. All validator should subclass from this so that
@@ -29,18 +52,12 @@ class ModelValidator(metaclass=RegistryMeta):
         might need from it.
         """
         result = self.do_validate(training_output, result_history)
-        # Avoid circular dependency at import time
-        from reagent.workflow.types import ValidationResult__Union
-
         # We need to use inspection because the result can be a future when running on
         # FBL
-        result_type = inspect.signature(self.do_validate).return_annotation
-        assert result_type != inspect.Signature.empty
-        # pyre-fixme[16]: `ValidationResult__Union` has no attribute
-        #  `make_union_instance`.
+        result_type = _do_validate_return_annotation(type(self))
         # pyre-fixme[16]: `ValidationResult__Union` has no attribute
         #  `make_union_instance`.
-        return ValidationResult__Union.make_union_instance(result, result_type)
+        return _validation_result_union().make_union_instance(result, result_type)
 
     @abc.abstractmethod
     def do_validate(